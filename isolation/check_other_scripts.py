@@ -17,15 +17,27 @@ from pathlib import Path
 from report_utils import write_report
 from parse_utils import read_text_safe, find_cabinet_dirs, PANELS_DIR, OBJECTS_DIR, CTL_DIR, REPORT_DIR
 
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
-
 SCRIPTS_DIR  = CTL_DIR
 SCRIPTS_LIBS = CTL_DIR  # где лежат .ctl
 REPORT_FILE  = REPORT_DIR / "other_scripts_check.txt"
 JSON_FILE    = REPORT_DIR / "other_scripts.json"
 
+CLASS_NAME_RE = re.compile(r'\bclass\s+(\w+)')
+
+# #uses "script" — варианты &quot;, \" и "
+USES_PATTERNS = [
+    re.compile(r'#uses\s+&quot;([^&]+)&quot;'),
+    re.compile(r'#uses\s+\\"([^\\]+)\\"'),
+    re.compile(r'#uses\s+"([^"]+)"'),
+]
+
+# if(settings["struct"] == "CLASS") — варианты &quot;, \" и "
+STRUCT_CLASS_PATTERNS = [
+    re.compile(r'if\s*\(.*?struct.*?==\s*&quot;(\w+)&quot;'),
+    re.compile(r'if\s*\(.*?struct.*?==\s*\\"(\w+)\\"'),
+    re.compile(r'if\s*\(.*?struct.*?==\s*"(\w+)"'),
+]
+
 
 def get_classes_from_ctl(ctl_path: Path) -> set[str]:
     """Извлекает имена классов из .ctl файла."""
@@ -34,18 +46,13 @@ def get_classes_from_ctl(ctl_path: Path) -> set[str]:
     text = read_text_safe(ctl_path)
     if text is None:
         return set()
-    return {m.group(1) for m in re.finditer(r'\bclass\s+(\w+)', text)}
+    return {m.group(1) for m in CLASS_NAME_RE.finditer(text)}
 
 
 def extract_uses(text: str) -> list[str]:
     """Извлекает имена скриптов из #uses."""
     uses = []
-    patterns = [
-        re.compile(r'#uses\s+&quot;([^&]+)&quot;'),
-        re.compile(r'#uses\s+\\"([^\\]+)\\"'),
-        re.compile(r'#uses\s+"([^"]+)"'),
-    ]
-    for p in patterns:
+    for p in USES_PATTERNS:
         for m in p.finditer(text):
             uses.append(m.group(1))
     return uses
@@ -54,12 +61,7 @@ def extract_uses(text: str) -> list[str]:
 def extract_struct_classes(text: str) -> set[str]:
     """Извлекает имена классов из if(settings["struct"] == "CLASS")."""
     classes = set()
-    patterns = [
-        re.compile(r'if\s*\(.*?struct.*?==\s*&quot;(\w+)&quot;'),
-        re.compile(r'if\s*\(.*?struct.*?==\s*\\"(\w+)\\"'),
-        re.compile(r'if\s*\(.*?struct.*?==\s*"(\w+)"'),
-    ]
-    for p in patterns:
+    for p in STRUCT_CLASS_PATTERNS:
         for m in p.finditer(text):
             classes.add(m.group(1))
     return classes
@@ -174,4 +176,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
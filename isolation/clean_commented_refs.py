@@ -33,10 +33,6 @@ import sys
 from pathlib import Path
 from collections import defaultdict
 
-# Windows cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
-
 SCRIPT_DIR  = Path(__file__).resolve().parent
 MODULES_DIR = SCRIPT_DIR.parent.parent
 REPORT_DIR  = MODULES_DIR / "reports"
@@ -398,4 +394,7 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Windows cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
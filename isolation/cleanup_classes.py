@@ -20,14 +20,29 @@ from pathlib import Path
 from report_utils import write_report
 from parse_utils import find_matching_brace, read_text_safe, find_cabinet_dirs, PANELS_DIR, OBJECTS_DIR, CTL_DIR, REPORT_DIR
 
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
-
 SCRIPTS_DIR = CTL_DIR
 REPORT_FILE = REPORT_DIR / "cleanup_classes_report.txt"
 JSON_FILE   = REPORT_DIR / "other_scripts.json"
 
+CLASS_NAME_RE = re.compile(r'\bclass\s+(\w+)')
+
+# Паттерн для поиска: if (settings["struct"] == "CLASS") или if(settings[&quot;struct&quot;] == &quot;CLASS&quot;)
+# Варианты: с/без пробелов, с/без &quot;
+STRUCT_IF_PATTERNS = [
+    # Escaped XML: &quot;struct&quot; ... &quot;CLASS&quot;
+    re.compile(
+        r'if\s*\(\s*settings\s*\[\s*&quot;struct&quot;\s*\]\s*==\s*&quot;(\w+)&quot;\s*\)'
+    ),
+    # Обычный: "struct" ... "CLASS"
+    re.compile(
+        r'if\s*\(\s*settings\s*\[\s*"struct"\s*\]\s*==\s*"(\w+)"\s*\)'
+    ),
+    # Backslash-escaped: \"struct\" ... \"CLASS\"
+    re.compile(
+        r'if\s*\(\s*settings\s*\[\s*\\"struct\\"\s*\]\s*==\s*\\"(\w+)\\"\s*\)'
+    ),
+]
+
 
 def get_classes_from_ctl(ctl_file: Path) -> set[str]:
     """Извлекает имена классов из Ventcontent_*.ctl."""
@@ -36,7 +51,7 @@ def get_classes_from_ctl(ctl_file: Path) -> set[str]:
         return set()
 
     classes = set()
-    for m in re.finditer(r'\bclass\s+(\w+)', text):
+    for m in CLASS_NAME_RE.finditer(text):
         classes.add(m.group(1))
     return classes
 
@@ -48,27 +63,10 @@ def remove_unused_class_blocks(text: str, available_classes: set[str]) -> tuple[
     """
     removed = []
 
-    # Паттерн для поиска: if (settings["struct"] == "CLASS") или if(settings[&quot;struct&quot;] == &quot;CLASS&quot;)
-    # Варианты: с/без пробелов, с/без &quot;
-    patterns = [
-        # Escaped XML: &quot;struct&quot; ... &quot;CLASS&quot;
-        re.compile(
-            r'if\s*\(\s*settings\s*\[\s*&quot;struct&quot;\s*\]\s*==\s*&quot;(\w+)&quot;\s*\)'
-        ),
-        # Обычный: "struct" ... "CLASS"
-        re.compile(
-            r'if\s*\(\s*settings\s*\[\s*"struct"\s*\]\s*==\s*"(\w+)"\s*\)'
-        ),
-        # Backslash-escaped: \"struct\" ... \"CLASS\"
-        re.compile(
-            r'if\s*\(\s*settings\s*\[\s*\\"struct\\"\s*\]\s*==\s*\\"(\w+)\\"\s*\)'
-        ),
-    ]
-
     # Собираем все if-блоки с позициями (обрабатываем с конца чтобы не сбивать индексы)
     blocks_to_remove = []
 
-    for pattern in patterns:
+    for pattern in STRUCT_IF_PATTERNS:
         for m in pattern.finditer(text):
             class_name = m.group(1)
             if class_name in available_classes:
@@ -246,4 +244,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
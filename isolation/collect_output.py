@@ -31,10 +31,6 @@ from parse_utils import (
     OBJECTS_DIR, LCSMEMO_DIR, CTL_DIR,
 )
 
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
-
 OUTPUT_DIR = MODULES_DIR / "output"
 
 # Базовый путь — родитель ventcontent (т.е. Modules/)
@@ -118,4 +114,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
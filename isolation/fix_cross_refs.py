@@ -18,10 +18,6 @@ from pathlib import Path
 from report_utils import write_report
 from parse_utils import read_text_safe, find_cabinet_dirs, PANELS_DIR, OBJECTS_DIR, REPORT_DIR
 
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
-
 REPORT_FILE = REPORT_DIR / "cross_refs_fix_report.txt"
 
 # Ищем objects/...xml, но НЕ уже заменённые objects/objects_...
@@ -217,4 +213,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
@@ -15,13 +15,24 @@
 
 Утилиты:
 - read_text_safe() — чтение файла с fallback по кодировкам
+- read_bytes_safe() / decode_text_safe() — то же в два шага (проверка байтов до декодирования)
+- iter_xml() — рекурсивный обход *.xml через os.scandir (пути-строки)
+- panels_rel() — путь относительно PANELS_DIR с / как разделителем
+- strip_comments() / code_segments() — код без комментариев (копией / участками)
 - find_matching_brace() — поиск закрывающей } с учётом строк/комментариев
-- load_active_cabinets() — чтение cabinets.txt (None = все)
+- load_active_cabinets() — чтение cabinets.txt (None = все, кэш на процесс)
 - find_cabinet_dirs() — поиск папок objects_<ШКАФ>/ с фильтрацией
 - find_mnemo_dirs() — поиск папок мнемосхем с фильтрацией
+- parallel_map() — map() по процессам для поштучной обработки файлов
+- load_pickle_cache() / save_pickle_cache() — дисковый кэш между запусками
 """
 
+import io
+import os
+import pickle
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # === Общие пути проекта ===
@@ -37,19 +48,120 @@ REPORT_DIR   = MODULES_DIR / "reports"                       # Modules/reports/
 OLD_MNEMO_DIR = MODULES_DIR / "old_mnemo"                    # Modules/old_mnemo/
 
 
-def read_text_safe(path: Path) -> str | None:
+def read_text_safe(path: Path | str) -> str | None:
     """Читает текстовый файл, пробуя utf-8 и cp1251. Возвращает None при ошибке."""
     for enc in ("utf-8", "cp1251"):
         try:
-            return path.read_text(encoding=enc)
+            with open(path, encoding=enc) as f:
+                return f.read()
         except (UnicodeDecodeError, OSError):
             continue
     return None
 
 
+def read_bytes_safe(path: Path | str) -> bytes | None:
+    """Читает файл целиком в bytes. Возвращает None при ошибке."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def decode_text_safe(data: bytes) -> str | None:
+    """
+    Декодирует уже прочитанный файл так же, как read_text_safe
+    (utf-8, затем cp1251; переводы строк \r\n и \r → \n). None — не декодируется.
+    """
+    for enc in ("utf-8", "cp1251"):
+        try:
+            if b"\r" not in data:
+                return data.decode(enc)
+            return io.TextIOWrapper(io.BytesIO(data), encoding=enc).read()
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def iter_xml(root: Path | str):
+    """
+    Рекурсивно перечисляет *.xml файлы под root (как rglob("*.xml")), отдаёт str-пути.
+    Тип записи берётся из os.scandir без лишних stat; по симлинкам на папки не спускается.
+    Порядок — порядок обхода ФС (нужен порядок — сортировать вызывающему).
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.normcase(entry.name).endswith(".xml") and entry.is_file():
+                    yield entry.path
+
+
+_PANELS_PREFIX_LEN = len(os.fspath(PANELS_DIR)) + 1
+
+
+def panels_rel(path: str) -> str:
+    """Путь файла внутри PANELS_DIR → относительный путь с '/' (objects/..., vision/...)."""
+    return path[_PANELS_PREFIX_LEN:].replace("\\", "/")
+
+
 # Многострочные комментарии /* ... */
 _MULTI_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
 
+# Код строки до однострочного комментария // (группа 1) + сам комментарий.
+# Строковые литералы ("..." / '...', \x — escape; незакрытый обрывается концом
+# строки) поглощаются целиком, поэтому // внутри них комментарием не считается.
+# Применяется к одной строке (endpos = конец строки); совпадение есть всегда.
+_LINE_COMMENT = re.compile(
+    r'((?:[^"\'/]+'
+    r'|"(?:\\.|[^"\\\n])*(?:"|\\?(?=\n|\Z))'
+    r"|'(?:\\.|[^'\\\n])*(?:'|\\?(?=\n|\Z))"
+    r'|/(?!/))*)'
+    r'(?://[^\n]*)?'
+)
+
+
+def code_segments(text: str) -> tuple[str, list[tuple[int, int]]]:
+    """
+    Код без комментариев без сборки новой строки:
+    возвращает (текст без /* */, [(start, end), ...] участков вне // комментариев).
+    strip_comments(text) == "".join(code[s:e] for s, e in spans).
+
+    Разбираются только строки, где встречается //. Каждый следующий участок
+    начинается с '\n', поэтому pattern.finditer(code, s, e) по участкам даёт те же
+    совпадения, что и по strip_comments(text), если паттерн не переходит через
+    перевод строки.
+    """
+    code = _MULTI_COMMENT.sub('', text)
+    length = len(code)
+    spans: list[tuple[int, int]] = []
+    seg_start = 0
+    pos = 0
+    while True:
+        j = code.find('//', pos)
+        if j < 0:
+            break
+        line_start = code.rfind('\n', 0, j) + 1
+        line_end = code.find('\n', j)
+        if line_end < 0:
+            line_end = length
+        # Где на этой строке начинается комментарий (// в строках не считается)
+        cut = _LINE_COMMENT.match(code, line_start, line_end).end(1)
+        if cut < line_end:
+            if cut > seg_start:
+                spans.append((seg_start, cut))
+            seg_start = line_end
+        pos = line_end
+    if length > seg_start:
+        spans.append((seg_start, length))
+    return code, spans
+
 
 def strip_comments(text: str) -> str:
     """Убирает комментарии из текста, оставляя только рабочий код.
@@ -57,42 +169,8 @@ def strip_comments(text: str) -> str:
       - многострочные /* ... */
       - однострочные //  (не трогает // внутри строковых литералов)
     """
-    # 1. Убираем многострочные /* ... */
-    text = _MULTI_COMMENT.sub('', text)
-
-    # 2. Убираем однострочные // (но не внутри строк)
-    lines = text.split('\n')
-    cleaned = []
-    for line in lines:
-        result = []
-        in_string = False
-        string_char = None
-        i = 0
-        while i < len(line):
-            c = line[i]
-            if in_string:
-                result.append(c)
-                if c == '\\' and i + 1 < len(line):
-                    result.append(line[i + 1])
-                    i += 2
-                    continue
-                if c == string_char:
-                    in_string = False
-                i += 1
-            else:
-                if c in ('"', "'"):
-                    in_string = True
-                    string_char = c
-                    result.append(c)
-                    i += 1
-                elif c == '/' and i + 1 < len(line) and line[i + 1] == '/':
-                    break  # комментарий — обрезаем остаток строки
-                else:
-                    result.append(c)
-                    i += 1
-        cleaned.append(''.join(result))
-
-    return '\n'.join(cleaned)
+    code, spans = code_segments(text)
+    return "".join(code[s:e] for s, e in spans)
 
 
 def find_matching_brace(text: str, open_pos: int) -> int:
@@ -169,8 +247,13 @@ def find_matching_brace(text: str, open_pos: int) -> int:
 CABINETS_FILE = SCRIPT_DIR.parent / "cabinets.txt"           # scripts/cabinets.txt
 
 
-def load_active_cabinets() -> set[str] | None:
-    """Читает cabinets.txt → set имён. None = обрабатывать все."""
+@lru_cache(maxsize=1)
+def load_active_cabinets() -> frozenset[str] | None:
+    """Читает cabinets.txt → set имён. None = обрабатывать все.
+
+    Читается один раз на процесс: при in-process запуске (run_pipeline.py)
+    все шаги видят один и тот же список шкафов и не перечитывают файл.
+    """
     if not CABINETS_FILE.exists():
         return None
     names: set[str] = set()
@@ -178,7 +261,11 @@ def load_active_cabinets() -> set[str] | None:
         line = line.strip()
         if line and not line.startswith("#"):
             names.add(line)
-    return names if names else None
+    return frozenset(names) if names else None
+
+
+# Префикс папок изолированных объектов: objects/objects_<ШКАФ>/
+CABINET_PREFIX = "objects_"
 
 
 def find_cabinet_dirs(objects_dir: Path) -> list[Path]:
@@ -186,14 +273,17 @@ def find_cabinet_dirs(objects_dir: Path) -> list[Path]:
     if not objects_dir.exists():
         return []
     active = load_active_cabinets()
+    prefix_len = len(CABINET_PREFIX)
     dirs = []
-    for d in objects_dir.iterdir():
-        if not d.is_dir() or not d.name.startswith("objects_"):
-            continue
-        cab_name = d.name.replace("objects_", "", 1)
-        if active is not None and cab_name not in active:
-            continue
-        dirs.append(d)
+    # os.scandir: is_dir() берётся из данных readdir, без отдельного stat на запись
+    with os.scandir(objects_dir) as it:
+        for entry in it:
+            name = entry.name
+            if not name.startswith(CABINET_PREFIX) or not entry.is_dir():
+                continue
+            if active is not None and name[prefix_len:] not in active:
+                continue
+            dirs.append(Path(entry.path))
     return sorted(dirs)
 
 
@@ -203,10 +293,53 @@ def find_mnemo_dirs() -> list[Path]:
         return []
     active = load_active_cabinets()
     dirs = []
-    for d in LCSMEMO_DIR.iterdir():
-        if not d.is_dir():
-            continue
-        if active is not None and d.name not in active:
-            continue
-        dirs.append(d)
+    with os.scandir(LCSMEMO_DIR) as it:
+        for entry in it:
+            if active is not None and entry.name not in active:
+                continue
+            if not entry.is_dir():
+                continue
+            dirs.append(Path(entry.path))
     return sorted(dirs)
+
+
+# Меньше файлов — обычный map(): запуск процессов дороже самой работы
+PARALLEL_MIN_ITEMS = 200
+
+
+def parallel_map(func, *iterables) -> list:
+    """
+    Аналог list(map(func, *iterables)) с раздачей по процессам (ProcessPoolExecutor).
+    Порядок результатов сохраняется. func — функция уровня модуля,
+    аргументы и результат должны сериализоваться pickle.
+    """
+    args = [list(it) for it in iterables]
+    count = len(args[0]) if args else 0
+    workers = os.cpu_count() or 1
+    if count < PARALLEL_MIN_ITEMS or workers < 2:
+        return list(map(func, *args))
+    chunksize = max(1, count // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(func, *args, chunksize=chunksize))
+
+
+def load_pickle_cache(path: Path) -> dict:
+    """Читает dict-кэш из pickle. Нет файла / битый / другой формат → пустой dict."""
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_pickle_cache(path: Path, data: dict):
+    """Атомарно сохраняет dict-кэш (через временный файл + os.replace). Ошибки не фатальны."""
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"  ⚠ Кэш не сохранён ({path.name}): {e}")
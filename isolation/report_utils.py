@@ -10,27 +10,40 @@
 """
 
 import sys
+from collections.abc import Iterable
 from datetime import datetime
 from pathlib import Path
 
 
-def write_report(filepath: Path | str, lines: list[str]):
+# Линия-разделитель запусков в режиме --append
+_RULE = "━" * 70 + "\n"
+
+
+def write_report(filepath: Path | str, lines: Iterable[str]):
     """
     Записывает отчёт в файл.
     Без --append: перезаписывает файл.
     С --append: добавляет в конец с разделителем и таймстампом.
+
+    lines — любой итерируемый источник строк (в т.ч. генератор): строки
+    пишутся потоком через буфер, без склейки всего отчёта в памяти.
+    Переводы строк — всегда LF.
     """
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    content = "\n".join(lines) + "\n"
     append_mode = "--append" in sys.argv
 
-    if append_mode:
-        sep = "\n" + "━" * 70 + "\n"
-        sep += f"▶ Запуск: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        sep += "━" * 70 + "\n\n"
-        with open(filepath, "a", encoding="utf-8") as f:
-            f.write(sep + content)
-    else:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(content)
+    with open(filepath, "a" if append_mode else "w", encoding="utf-8",
+              newline="\n", buffering=1 << 20) as f:
+        if append_mode:
+            stamp = f"▶ Запуск: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f.write("\n" + _RULE + stamp + _RULE + "\n")
+
+        it = iter(lines)
+        first = next(it, None)
+        if first is None:
+            # Пустой отчёт — одна пустая строка, как и раньше
+            f.write("\n")
+            return
+        f.write(first + "\n")
+        f.writelines(line + "\n" for line in it)
@@ -6,6 +6,13 @@ Pipeline-раннер для изоляции шкафов (замена run_pip
   python run_pipeline.py --append         — append-режим отчётов
   python run_pipeline.py --from 5         — начать с шага 5
   python run_pipeline.py --only 8         — только шаг 8
+  python run_pipeline.py --subprocess     — каждый шаг в отдельном процессе
+  python run_pipeline.py --parallel       — независимые шаги параллельно (по DEPS)
+
+По умолчанию шаги выполняются в этом же интерпретаторе: модуль шага
+импортируется и вызывается его main() с подменённым sys.argv.
+В режиме --parallel каждый шаг — отдельный процесс; вывод шага
+собирается и печатается целиком по его завершении.
 
 Шаги:
    1. process_mnemo.py           — копирование объектов, подстановка путей
@@ -25,15 +32,18 @@ import os
 import sys
 import subprocess
 import argparse
+import importlib
 import time
-
-# UTF-8 для вывода (Windows cp866/cp1251 ломает Unicode-символы)
-sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
 PYTHON = sys.executable  # тот же интерпретатор, которым запущен run_pipeline.py
 
+# Шаги импортируют report_utils/parse_utils и друг друга по имени модуля
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
 STEPS = [
     (1,  "process_mnemo.py",           [PYTHON, "process_mnemo.py"]),
     (2,  "fix_cross_refs.py",          [PYTHON, "fix_cross_refs.py"]),
@@ -48,44 +58,198 @@ STEPS = [
     (11, "collect_output.py (deploy)", [PYTHON, "collect_output.py", "--clean"]),
 ]
 
-TOTAL = len(STEPS)
+# Зависимости шагов (для --parallel): шаг стартует, когда завершены все из списка.
+# 6 читает только CSV мнемосхем и PNR_Ventcontent.ctl — не зависит от 1–5.
+# 8 и 9 только читают objects/ — выполняются параллельно; 10 правит objects/,
+# поэтому ждёт обоих.
+DEPS: dict[int, list[int]] = {
+    1:  [],
+    2:  [1],
+    3:  [2],
+    4:  [3],
+    5:  [4],
+    6:  [],
+    7:  [5],
+    8:  [7],
+    9:  [6, 7],
+    10: [8, 9],
+    11: [10],
+}
 
+# Шаги с поддержкой --append
+APPEND_STEPS = {1, 2, 3, 4, 5, 7, 8, 9, 10}
 
-def run_step(num: int, name: str, cmd: list[str], append: bool) -> bool:
-    """Выполняет один шаг. Возвращает True при успехе."""
-    # Шаги с поддержкой --append
-    APPEND_STEPS = {1, 2, 3, 4, 5, 7, 8, 9, 10}
+TOTAL = len(STEPS)
 
+
+def step_cmd(num: int, cmd: list[str], append: bool) -> list[str]:
+    """Команда шага с учётом --append."""
     full_cmd = list(cmd)
     if append and num in APPEND_STEPS:
         full_cmd.append("--append")
+    return full_cmd
 
-    print()
-    print("─" * 56)
-    print(f"  [{num}/{TOTAL}]  {name}")
-    print("─" * 56)
 
+def step_env() -> dict[str, str]:
+    """Окружение для шага, запускаемого отдельным процессом."""
     env = os.environ.copy()
     env["PYTHONIOENCODING"] = "utf-8"
     # Гарантируем что scripts/isolation/ в PYTHONPATH для импорта report_utils/parse_utils
     env["PYTHONPATH"] = SCRIPTS_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
 
-    t0 = time.time()
+
+def run_inprocess(cmd: list[str]) -> int:
+    """
+    Выполняет шаг в текущем процессе: import <скрипт> → main().
+    cmd — та же команда, что и для subprocess ([PYTHON, "скрипт.py", аргументы...]).
+    Возвращает код возврата как у отдельного процесса.
+    """
+    module_name = os.path.splitext(cmd[1])[0]
+    old_argv = sys.argv
+    sys.argv = list(cmd[1:])
+    try:
+        module = importlib.import_module(module_name)
+        module.main()
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        return e.code if isinstance(e.code, int) else 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = old_argv
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+def run_subprocess(cmd: list[str]) -> int:
+    """Выполняет шаг отдельным процессом Python. Возвращает код возврата."""
+    sys.stdout.flush()
     result = subprocess.run(
-        full_cmd,
+        cmd,
+        cwd=SCRIPTS_DIR,
+        env=step_env(),
+    )
+    return result.returncode
+
+
+def run_captured(cmd: list[str]) -> tuple[int, str, float]:
+    """
+    Выполняет шаг отдельным процессом, собирая stdout+stderr.
+    Возвращает (код возврата, вывод, время в секундах).
+    """
+    t0 = time.time()
+    proc = subprocess.Popen(
+        cmd,
         cwd=SCRIPTS_DIR,
-        env=env,
+        env=step_env(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        # Текстовый режим: \r\n ребёнка → \n, иначе при перенаправлении
+        # вывода в Windows родитель допишет ещё один \r
+        text=True,
+        encoding="utf-8",
+        errors="replace",
     )
+    out, _ = proc.communicate()
+    return proc.returncode, out, time.time() - t0
+
+
+def run_step(num: int, name: str, cmd: list[str], append: bool,
+             use_subprocess: bool = False) -> bool:
+    """Выполняет один шаг. Возвращает True при успехе."""
+    full_cmd = step_cmd(num, cmd, append)
+
+    print()
+    print("─" * 56)
+    print(f"  [{num}/{TOTAL}]  {name}")
+    print("─" * 56)
+
+    t0 = time.time()
+    if use_subprocess:
+        returncode = run_subprocess(full_cmd)
+    else:
+        returncode = run_inprocess(full_cmd)
     elapsed = time.time() - t0
 
-    if result.returncode == 0:
+    if returncode == 0:
         print(f"  [{num}/{TOTAL}]  OK  ({elapsed:.1f}s)")
         return True
     else:
-        print(f"  [{num}/{TOTAL}]  FAILED  (rc={result.returncode}, {elapsed:.1f}s)")
+        print(f"  [{num}/{TOTAL}]  FAILED  (rc={returncode}, {elapsed:.1f}s)")
         return False
 
 
+def run_parallel(steps: list[tuple[int, str, list[str]]], done: set[int],
+                 append: bool) -> tuple[int, list[int], list[int]]:
+    """
+    Выполняет шаги по графу DEPS, независимые — одновременно.
+    done — уже выполненные/пропущенные шаги (их зависимости считаются выполненными).
+    Одновременно — не больше workers шагов (половина CPU, минимум 1).
+    После первой ошибки новые шаги не запускаются, запущенные дорабатывают.
+    Возвращает (число успешных шагов, номера упавших шагов, номера незапущенных шагов).
+    """
+    by_num = {num: (name, cmd) for num, name, cmd in steps}
+    pending = set(by_num)
+    done = set(done)
+    passed = 0
+    failed: list[int] = []
+    workers = max(1, (os.cpu_count() or 2) // 2)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while True:
+            if not failed:
+                # Не больше workers одновременно: остальные ждут в pending,
+                # а не в очереди пула — START печатается только для реально запущенных
+                ready = sorted(n for n in pending if all(d in done for d in DEPS[n]))
+                for num in ready[:workers - len(running)]:
+                    pending.discard(num)
+                    name, cmd = by_num[num]
+                    print(f"  [{num}/{TOTAL}]  START  {name}")
+                    running[pool.submit(run_captured, step_cmd(num, cmd, append))] = num
+                sys.stdout.flush()
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in sorted(finished, key=running.get):
+                num = running.pop(fut)
+                returncode, output, elapsed = fut.result()
+
+                print()
+                print("─" * 56)
+                print(f"  [{num}/{TOTAL}]  {by_num[num][0]}")
+                print("─" * 56)
+                sys.stdout.write(output)
+                if returncode == 0:
+                    print(f"  [{num}/{TOTAL}]  OK  ({elapsed:.1f}s)")
+                    done.add(num)
+                    passed += 1
+                else:
+                    print(f"  [{num}/{TOTAL}]  FAILED  (rc={returncode}, {elapsed:.1f}s)")
+                    failed.append(num)
+                sys.stdout.flush()
+
+    return passed, sorted(failed), sorted(pending)
+
+
+def resume_hint(args, num: int) -> str:
+    """Команда для продолжения пайплайна с шага num."""
+    hint = f"  python run_pipeline.py"
+    if args.append:
+        hint += " --append"
+    if args.use_subprocess:
+        hint += " --subprocess"
+    if args.parallel:
+        hint += " --parallel"
+    hint += f" --from {num}"
+    return hint
+
+
 def main():
     parser = argparse.ArgumentParser(description="Ventcontent Split Pipeline")
     parser.add_argument("--append", action="store_true",
@@ -94,6 +258,10 @@ def main():
                         help="Начать с шага N")
     parser.add_argument("--only", type=int, default=0,
                         help="Выполнить только шаг N")
+    parser.add_argument("--subprocess", action="store_true", dest="use_subprocess",
+                        help="Запускать каждый шаг отдельным процессом Python")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Независимые шаги параллельно (отдельные процессы, игнорируется с --only)")
     args = parser.parse_args()
 
     print()
@@ -109,13 +277,47 @@ def main():
         print(f"  Начать с шага: {args.from_step}")
     if args.only:
         print(f"  Только шаг: {args.only}")
+    # --only: один шаг — параллелить нечего
+    parallel = args.parallel and not args.only
+    if parallel:
+        mode = "parallel"
+    elif args.use_subprocess:
+        mode = "subprocess"
+    else:
+        mode = "in-process"
+    print(f"  Режим: {mode}")
     print(f"  Каталог: {SCRIPTS_DIR}")
 
     passed = 0
     failed = 0
     skipped = 0
+    not_run = 0
+
+    if parallel:
+        to_run = []
+        for num, name, cmd in STEPS:
+            if num < args.from_step:
+                print(f"  [{num}/{TOTAL}]  SKIP  {name}")
+                skipped += 1
+            else:
+                to_run.append((num, name, cmd))
+        done = {num for num, _, _ in STEPS if num < args.from_step}
+        passed, failed_steps, pending_steps = run_parallel(to_run, done, args.append)
+        failed = len(failed_steps)
+        not_run = len(pending_steps)
+        if pending_steps:
+            print()
+            names = {num: name for num, name, _ in STEPS}
+            for num in pending_steps:
+                print(f"  [{num}/{TOTAL}]  NOT RUN  {names[num]}")
+        if failed_steps:
+            # --from N считает выполненными все шаги < N → продолжать
+            # с наименьшего шага, который не завершился (упал или не стартовал)
+            print()
+            print(f"  Pipeline остановлен. Продолжить:")
+            print(resume_hint(args, min(failed_steps + pending_steps)))
 
-    for num, name, cmd in STEPS:
+    for num, name, cmd in ([] if parallel else STEPS):
         # --only: выполнить только указанный шаг
         if args.only and args.only != num:
             continue
@@ -126,7 +328,7 @@ def main():
             skipped += 1
             continue
 
-        ok = run_step(num, name, cmd, args.append)
+        ok = run_step(num, name, cmd, args.append, args.use_subprocess)
         if ok:
             passed += 1
         else:
@@ -135,11 +337,7 @@ def main():
                 break
             print()
             print(f"  Pipeline остановлен. Продолжить:")
-            hint = f"  python run_pipeline.py"
-            if args.append:
-                hint += " --append"
-            hint += f" --from {num}"
-            print(hint)
+            print(resume_hint(args, num))
             break
 
     print()
@@ -148,7 +346,10 @@ def main():
         print("  РЕЗУЛЬТАТ: ОШИБКА")
     else:
         print("  РЕЗУЛЬТАТ: OK")
-    print(f"  Выполнено: {passed}  Ошибок: {failed}  Пропущено: {skipped}")
+    summary = f"  Выполнено: {passed}  Ошибок: {failed}  Пропущено: {skipped}"
+    if not_run:
+        summary += f"  Не запущено: {not_run}"
+    print(summary)
     print("═" * 56)
     print()
 
@@ -156,4 +357,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # UTF-8 для вывода (Windows cp866/cp1251 ломает Unicode-символы)
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+    sys.stderr.reconfigure(encoding="utf-8", errors="replace")
     main()
@@ -9,57 +9,79 @@
 Результат: problem_scan_report.txt
 """
 
+import os
 import re
 import sys
 from pathlib import Path
 
 from report_utils import write_report
-from parse_utils import read_text_safe, PANELS_DIR, OBJECTS_DIR, REPORT_DIR
-
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+from parse_utils import read_bytes_safe, decode_text_safe, parallel_map, iter_xml, panels_rel, OBJECTS_DIR, REPORT_DIR
 
 REPORT_FILE = REPORT_DIR / "problem_scan_report.txt"
 
-
-def scan_file(xml_file: Path, rel_path: str) -> list[str]:
+# Скрипты в XML — содержимое CDATA секций
+CDATA_RE = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+# else if (... struct ...)
+ELSE_IF_STRUCT_RE = re.compile(r'else\s+if\s*\(.*struct')
+
+
+def find_line_comment(line: str) -> int:
+    """
+    Позиция // вне строки (строки ограничены &quot;) или -1.
+    Прыжки str.find между &quot; и // вместо посимвольного обхода.
+    """
+    in_str = False
+    i = 0
+    while True:
+        slash = line.find('//', i)
+        if slash < 0:
+            return -1
+        quot = line.find('&quot;', i, slash)
+        if quot >= 0:
+            in_str = not in_str
+            i = quot + 6
+            continue
+        if not in_str:
+            return slash
+        i = slash + 2
+
+
+def scan_file(xml_file: Path | str, rel_path: str) -> list[str]:
     """Сканирует один XML файл на проблемные паттерны."""
     issues = []
 
-    text = read_text_safe(xml_file)
+    # Без CDATA проверять нечего — файл даже не декодируем
+    data = read_bytes_safe(xml_file)
+    if data is None or b'<![CDATA[' not in data:
+        return issues
+    text = decode_text_safe(data)
     if text is None:
         return issues
 
     # Ищем только в CDATA секциях (скрипты)
-    cdata_pattern = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
-    
-    for cdata_match in cdata_pattern.finditer(text):
+    for cdata_match in CDATA_RE.finditer(text):
         script = cdata_match.group(1)
         script_start = cdata_match.start(1)
+        # Все проверки требуют // (комментарий) или struct — без них скрипт пропускаем
+        if '//' not in script and 'struct' not in script:
+            continue
         lines = script.split('\n')
 
         for line_idx, line in enumerate(lines):
+            if '//' not in line and 'struct' not in line:
+                continue
             stripped = line.strip()
 
             # 1. Комментарий // с &quot; внутри
-            comment_pos = -1
-            # Ищем // не внутри строки
-            in_str = False
-            for ci in range(len(stripped) - 1):
-                if stripped[ci:ci+6] == '&quot;':
-                    in_str = not in_str
-                if not in_str and stripped[ci] == '/' and stripped[ci+1] == '/':
-                    comment_pos = ci
-                    break
-            
+            comment_pos = find_line_comment(stripped)
+
             if comment_pos >= 0:
                 comment = stripped[comment_pos:]
                 if '&quot;' in comment:
                     issues.append(f"  [COMMENT+QUOT] {rel_path} строка ~{line_idx+1}: {stripped[:120]}")
 
             # 2. else if с struct
-            if re.search(r'else\s+if\s*\(.*struct', stripped):
+            if ELSE_IF_STRUCT_RE.search(stripped):
                 issues.append(f"  [ELSE IF] {rel_path} строка ~{line_idx+1}: {stripped[:120]}")
 
             # 3. switch/case с struct
@@ -91,9 +113,12 @@ def main():
 
     counts = {"COMMENT+QUOT": 0, "ELSE IF": 0, "SWITCH": 0}
 
-    for xml_file in sorted(OBJECTS_DIR.rglob("*.xml")):
-        rel = str(xml_file.relative_to(PANELS_DIR)).replace("\\", "/")
-        issues = scan_file(xml_file, rel)
+    # Порядок как у sorted(Path): по компонентам пути (на Windows — без учёта регистра)
+    xml_files = sorted(iter_xml(OBJECTS_DIR), key=lambda p: os.path.normcase(p).split(os.sep))
+    rels = [panels_rel(f) for f in xml_files]
+
+    # Файлы независимы — сканируем параллельно, порядок отчёта сохраняется
+    for issues in parallel_map(scan_file, xml_files, rels):
         if issues:
             report.extend(issues)
             for iss in issues:
@@ -114,4 +139,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
@@ -11,93 +11,122 @@
 import re
 import sys
 import csv
+from bisect import bisect_right
 from pathlib import Path
 
 from report_utils import write_report
-from parse_utils import read_text_safe, find_mnemo_dirs, LCSMEMO_DIR, CTL_DIR, REPORT_DIR
-
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+from parse_utils import (
+    read_text_safe, find_mnemo_dirs, load_pickle_cache, save_pickle_cache,
+    LCSMEMO_DIR, CTL_DIR, REPORT_DIR,
+)
 
 CTL_FILE      = CTL_DIR / "PNR_Ventcontent.ctl"
 DEMO_CTL_FILE = Path(__file__).resolve().parent / "Denostration_Ventcontent.ctl"
 SCRIPTS_DIR   = CTL_DIR
 REPORT_FILE   = REPORT_DIR / "split_ctl_report.txt"
+# Кэш struct по CSV между запусками: {путь: (mtime_ns, size, (struct, ...))}
+STRUCT_CACHE_FILE = REPORT_DIR / ".struct_cache.pkl"
+# Поднимать при изменении read_csv_structs: кэш другой версии считается пустым
+STRUCT_CACHE_VERSION = 1
+
+# class NAME [: PARENT] {
+CLASS_RE = re.compile(r'\bclass\s+(\w+)\s*(?::\s*(\w+))?\s*\{', re.DOTALL)
+# public int setValueLib(...) {
+SETVAL_RE = re.compile(r'public\s+int\s+setValueLib\s*\([^)]*\)\s*\{', re.MULTILINE)
+# private global TYPE var;
+GLOBAL_RE = re.compile(r'(private\s+global\s+(\w+)\s+(\w+)\s*;)')
+# public const mapping mapClassVent = makeMapping(
+MAPPING_RE = re.compile(
+    r'(public\s+const\s+mapping\s+(?:mapClassVent|mapClass)\s*=\s*makeMapping\s*\()',
+    re.MULTILINE
+)
+# "KEY", var — запись mapping
+ENTRY_RE = re.compile(r'"(\w+)"\s*,\s*(\w+)')
+MAP_CLASS_RE = re.compile(r'\bmapClass\b')
+# Строка с #uses (целиком, с отступом)
+USES_LINE_RE = re.compile(r'^[^\S\n]*#uses[^\n]*', re.MULTILINE)
+_PAREN_RE = re.compile(r'[()]')
+# Значимые для баланса { } токены: скобки, кавычки, начало комментария
+_BLOCK_TOKEN_RE = re.compile(r'[{}"\']|/[/*]')
+
+# Тело строкового литерала до закрывающей кавычки (\x — escape любого символа)
+_DQ_BODY_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SQ_BODY_RE = re.compile(r"[^'\\]*(?:\\.[^'\\]*)*", re.DOTALL)
 
 
 def find_block_end(text: str, start: int) -> int:
     """
     Находит конец блока по балансу { } от позиции start.
     Пропускает содержимое строк ("...") и комментариев (// и /* */).
+    Незакрытая строка/комментарий — конец блока = конец текста.
     """
     depth = 0
     i = start
     length = len(text)
+    search = _BLOCK_TOKEN_RE.search
 
-    while i < length:
-        c = text[i]
+    # Прыжки между значимыми токенами — обычный код пропускается за один search
+    while (m := search(text, i)) is not None:
+        tok = m.group()
+        i = m.end()
 
-        # Строковый литерал в двойных кавычках
-        if c == '"':
-            i += 1
-            while i < length:
-                if text[i] == '\\':
-                    i += 2  # пропускаем escaped символ
-                    continue
-                if text[i] == '"':
-                    break
-                i += 1
-            i += 1
-            continue
+        # Фигурные скобки
+        if tok == '{':
+            depth += 1
+        elif tok == '}':
+            depth -= 1
+            if depth == 0:
+                return i - 1
 
-        # Строковый литерал в одинарных кавычках
-        if c == "'":
-            i += 1
-            while i < length:
-                if text[i] == '\\':
-                    i += 2
-                    continue
-                if text[i] == "'":
-                    break
-                i += 1
+        # Строковый литерал в двойных/одинарных кавычках
+        elif tok == '"' or tok == "'":
+            i = (_DQ_BODY_RE if tok == '"' else _SQ_BODY_RE).match(text, i).end()
+            if i >= length or text[i] != tok:
+                return length - 1
             i += 1
-            continue
 
         # Однострочный комментарий //
-        if c == '/' and i + 1 < length and text[i + 1] == '/':
-            i += 2
-            while i < length and text[i] != '\n':
-                i += 1
+        elif tok == '//':
+            i = text.find('\n', i)
+            if i < 0:
+                return length - 1
             i += 1
-            continue
 
         # Многострочный комментарий /* ... */
-        if c == '/' and i + 1 < length and text[i + 1] == '*':
+        else:
+            i = text.find('*/', i)
+            if i < 0:
+                return length - 1
             i += 2
-            while i + 1 < length:
-                if text[i] == '*' and text[i + 1] == '/':
-                    i += 2
-                    break
-                i += 1
-            continue
 
-        # Фигурные скобки
-        if c == '{':
-            depth += 1
-        elif c == '}':
-            depth -= 1
-            if depth == 0:
-                return i
+    return length - 1
 
-        i += 1
 
-    return length - 1
+def merge_ranges(ranges: list[tuple[int, int, str]]) -> tuple[list[int], list[int]]:
+    """
+    Диапазоны [start, end] (могут пересекаться/вкладываться) → непересекающиеся
+    отрезки по возрастанию: (starts, ends) для in_ranges().
+    """
+    starts: list[int] = []
+    ends: list[int] = []
+    for cs, ce, _ in sorted(ranges):
+        if ends and cs <= ends[-1]:
+            ends[-1] = max(ends[-1], ce)
+        else:
+            starts.append(cs)
+            ends.append(ce)
+    return starts, ends
+
+
+def in_ranges(starts: list[int], ends: list[int], pos: int) -> bool:
+    """Попадает ли pos в один из отрезков merge_ranges() — бинарный поиск."""
+    i = bisect_right(starts, pos) - 1
+    return i >= 0 and pos <= ends[i]
 
 
 def parse_ctl(text: str) -> dict:
     """Парсит .ctl файл."""
-    lines = text.split('\n')
+    length = len(text)
 
     result = {
         "uses_lines": [],
@@ -114,31 +143,28 @@ def parse_ctl(text: str) -> dict:
     }
 
     # === #uses ===
-    for line in lines:
-        if line.strip().startswith('#uses'):
-            result["uses_lines"].append(line)
+    result["uses_lines"] = USES_LINE_RE.findall(text)
 
     # === Классы ===
-    class_pattern = re.compile(r'\bclass\s+(\w+)\s*(?::\s*(\w+))?\s*\{', re.DOTALL)
     class_positions = []
-    for m in class_pattern.finditer(text):
+    for m in CLASS_RE.finditer(text):
         # Пропускаем закомментированные классы (// class ...)
         line_start = text.rfind('\n', 0, m.start()) + 1
         before_class = text[line_start:m.start()].strip()
         if before_class.startswith('//'):
             continue
-        class_positions.append((m.start(), m.group(1), m.group(2)))
+        # Паттерн заканчивается на { — позиция скобки известна из match
+        class_positions.append((m.start(), m.end() - 1, m.group(1), m.group(2)))
 
     # Для быстрой проверки "внутри класса ли позиция"
     class_ranges = []  # (start_pos, end_pos, name)
 
-    for pos, name, parent in class_positions:
-        brace_start = text.index('{', pos)
+    for pos, brace_start, name, parent in class_positions:
         body_end = find_block_end(text, brace_start)
         end = body_end + 1
-        while end < len(text) and text[end] in ' \t\r':
+        while end < length and text[end] in ' \t\r':
             end += 1
-        if end < len(text) and text[end] == ';':
+        if end < length and text[end] == ';':
             end += 1
 
         block_text = text[pos:end]
@@ -153,13 +179,13 @@ def parse_ctl(text: str) -> dict:
             if "setValueLib" in block_text:
                 result["classes_using_setValueLib"].add(name)
 
+    # "Внутри класса ли позиция" — bisect по отрезкам вместо перебора всех классов
+    range_starts, range_ends = merge_ranges(class_ranges)
+
     # === setValueLib (вне классов) ===
-    setval_pattern = re.compile(
-        r'public\s+int\s+setValueLib\s*\([^)]*\)\s*\{', re.MULTILINE
-    )
-    for m in setval_pattern.finditer(text):
+    for m in SETVAL_RE.finditer(text):
         pos = m.start()
-        inside = any(cs <= pos <= ce for cs, ce, _ in class_ranges)
+        inside = in_ranges(range_starts, range_ends, pos)
         if not inside:
             brace_pos = text.index('{', m.start())
             end_pos = find_block_end(text, brace_pos)
@@ -167,10 +193,9 @@ def parse_ctl(text: str) -> dict:
             break
 
     # === private global (вне классов) ===
-    global_pattern = re.compile(r'(private\s+global\s+(\w+)\s+(\w+)\s*;)')
-    for m in global_pattern.finditer(text):
+    for m in GLOBAL_RE.finditer(text):
         pos = m.start()
-        inside = any(cs <= pos <= ce for cs, ce, _ in class_ranges)
+        inside = in_ranges(range_starts, range_ends, pos)
         if not inside:
             # Пропускаем закомментированные глобалы (// private global ...)
             line_start = text.rfind('\n', 0, pos) + 1
@@ -183,29 +208,24 @@ def parse_ctl(text: str) -> dict:
             result["global_type_to_var"][gtype] = gvar
 
     # === mapping mapClassVent / mapClass (вне классов) ===
-    mapping_match = re.search(
-        r'(public\s+const\s+mapping\s+(?:mapClassVent|mapClass)\s*=\s*makeMapping\s*\()',
-        text, re.MULTILINE
-    )
+    mapping_match = MAPPING_RE.search(text)
     if mapping_match:
         pos = mapping_match.start()
-        inside = any(cs <= pos <= ce for cs, ce, _ in class_ranges)
+        inside = in_ranges(range_starts, range_ends, pos)
         if not inside:
             result["mapping_header"] = mapping_match.group(1)
             paren_start = mapping_match.end() - 1  # позиция (
-            # Ищем закрывающую )
+            # Ищем закрывающую ) — прыжками по скобкам
             depth = 1
-            i = paren_start + 1
-            while i < len(text) and depth > 0:
-                if text[i] == '(':
-                    depth += 1
-                elif text[i] == ')':
-                    depth -= 1
-                i += 1
+            i = length
+            for pm in _PAREN_RE.finditer(text, paren_start + 1):
+                depth += 1 if pm.group() == '(' else -1
+                if depth == 0:
+                    i = pm.end()
+                    break
             content = text[paren_start + 1:i - 1]
 
-            entry_pattern = re.compile(r'"(\w+)"\s*,\s*(\w+)')
-            for em in entry_pattern.finditer(content):
+            for em in ENTRY_RE.finditer(content):
                 # Пропускаем закомментированные записи
                 line_start = content.rfind('\n', 0, em.start()) + 1
                 before_entry = content[line_start:em.start()].strip()
@@ -216,25 +236,48 @@ def parse_ctl(text: str) -> dict:
     return result
 
 
-def get_cabinet_structs(cabinet_name: str) -> dict[str, set[str]]:
+def read_csv_structs(csv_text: str) -> tuple[str, ...]:
+    """Значения struct (5-я колонка) из CSV без заголовка — уникальные, в порядке появления."""
+    found: dict[str, None] = {}
+    reader = csv.reader(csv_text.strip().split('\n'))
+    next(reader, None)  # пропускаем заголовок
+    for row in reader:
+        if len(row) >= 5 and row[4].strip():
+            found[row[4].strip()] = None
+    return tuple(found)
+
+
+def get_cabinet_structs(cabinet_name: str, cache: dict | None = None,
+                        fresh: dict | None = None) -> dict[str, set[str]]:
     """Собирает уникальные struct из CSV и запоминает, в каких CSV они встречаются.
-    Возвращает dict: struct_name → set(csv_filename без пути)."""
+    Возвращает dict: struct_name → set(csv_filename без пути).
+    cache — {путь: (mtime_ns, size, structs)}: неизменённые CSV не перечитываются.
+    fresh — сюда пишутся записи всех CSV этого запуска (из кэша и перечитанные),
+    чтобы сохранить кэш без удалённых/переименованных файлов."""
     structs: dict[str, set[str]] = {}
     cabinet_dir = LCSMEMO_DIR / cabinet_name
     if not cabinet_dir.exists():
         return structs
     for csv_file in cabinet_dir.rglob("*.csv"):
-        csv_text = read_text_safe(csv_file)
-        if csv_text is None:
+        key = str(csv_file)
+        try:
+            st = csv_file.stat()
+        except OSError:
             continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            file_structs = cached[2]
+        else:
+            csv_text = read_text_safe(csv_file)
+            if csv_text is None:
+                continue
+            file_structs = read_csv_structs(csv_text)
+        if fresh is not None:
+            fresh[key] = (st.st_mtime_ns, st.st_size, file_structs)
         # Имя CSV относительно папки шкафа
         csv_name = csv_file.relative_to(cabinet_dir).as_posix()
-        reader = csv.reader(csv_text.strip().split('\n'))
-        next(reader, None)  # пропускаем заголовок
-        for row in reader:
-            if len(row) >= 5 and row[4].strip():
-                s = row[4].strip()
-                structs.setdefault(s, set()).add(csv_name)
+        for s in file_structs:
+            structs.setdefault(s, set()).add(csv_name)
     return structs
 
 
@@ -306,7 +349,7 @@ def merge_parsed(pnr: dict, demo: dict) -> dict:
     # Header всегда mapClassVent (PNR формат), даже если взят из Demo
     header = pnr["mapping_header"] or demo["mapping_header"]
     if header:
-        header = re.sub(r'\bmapClass\b', 'mapClassVent', header)
+        header = MAP_CLASS_RE.sub('mapClassVent', header)
     merged["mapping_header"] = header
     pnr_keys = {k for k, _ in pnr["mapping_entries"]}
     for mkey, mvar in demo["mapping_entries"]:
@@ -318,19 +361,26 @@ def merge_parsed(pnr: dict, demo: dict) -> dict:
     return merged
 
 
-def resolve_needed_classes(structs: set[str], parsed: dict) -> set[str]:
-    """Определяет нужные классы."""
-    needed = set()
-    all_classes = set(parsed["class_blocks"].keys())
+def index_parsed(parsed: dict) -> dict:
+    """
+    Добавляет в parsed производные индексы, общие для всех шкафов
+    (считаются один раз, а не на каждый шкаф):
+      all_classes — set имён классов
+      var_to_type — переменная global → тип
+      key_to_var  — ключ mapping → переменная
+    """
+    parsed["all_classes"] = set(parsed["class_blocks"])
+    parsed["var_to_type"] = {gvar: gtype for gtype, gvar, _ in parsed["global_list"]}
+    parsed["key_to_var"] = {mkey: mvar for mkey, mvar in parsed["mapping_entries"]}
+    return parsed
 
-    # Обратные индексы
-    var_to_type = {}
-    for gtype, gvar, _ in parsed["global_list"]:
-        var_to_type[gvar] = gtype
 
-    key_to_var = {}
-    for mkey, mvar in parsed["mapping_entries"]:
-        key_to_var[mkey] = mvar
+def resolve_needed_classes(structs: set[str], parsed: dict) -> set[str]:
+    """Определяет нужные классы. parsed — после index_parsed()."""
+    needed = set()
+    all_classes = parsed["all_classes"]
+    var_to_type = parsed["var_to_type"]
+    key_to_var = parsed["key_to_var"]
 
     for struct in structs:
         # 1. Прямое совпадение
@@ -359,10 +409,12 @@ def resolve_needed_classes(structs: set[str], parsed: dict) -> set[str]:
     return needed
 
 
-def build_ctl(needed_classes: set[str], parsed: dict) -> str:
-    """Собирает .ctl файл."""
-    all_classes = set(parsed["class_blocks"].keys())
-    excluded = all_classes - needed_classes
+def build_ctl(needed_classes: set[str], parsed: dict) -> tuple[str, int, int]:
+    """
+    Собирает .ctl файл. parsed — после index_parsed().
+    Возвращает (текст, оставлено global, оставлено записей mapping).
+    """
+    excluded = parsed["all_classes"] - needed_classes
 
     # Переменные нужных global
     needed_vars = set()
@@ -373,8 +425,7 @@ def build_ctl(needed_classes: set[str], parsed: dict) -> str:
     parts: list[str] = []
 
     # 1. #uses
-    for line in parsed["uses_lines"]:
-        parts.append(line)
+    parts.extend(parsed["uses_lines"])
     parts.append("")
     parts.append("")
 
@@ -396,26 +447,24 @@ def build_ctl(needed_classes: set[str], parsed: dict) -> str:
         parts.append("")
 
     # 5. private global
-    for gtype, gvar, gline in parsed["global_list"]:
-        if gtype not in excluded:
-            parts.append(gline)
+    kept_globals = [gline for gtype, _, gline in parsed["global_list"] if gtype not in excluded]
+    parts.extend(kept_globals)
     parts.append("")
 
     # 6. mapping
+    kept = [(k, v) for k, v in parsed["mapping_entries"]
+            if k not in excluded and v in needed_vars]
     if parsed["mapping_entries"]:
-        kept = [(k, v) for k, v in parsed["mapping_entries"]
-                if k not in excluded and v in needed_vars]
         if kept:
             parts.append(parsed["mapping_header"])
-            for i, (mkey, mvar) in enumerate(kept):
-                if i < len(kept) - 1:
-                    parts.append(f' "{mkey}", {mvar},')
-                else:
-                    parts.append(f'  "{mkey}", {mvar}')
+            # Все записи с запятой, последняя — без (и с двумя пробелами)
+            parts.extend([f' "{mkey}", {mvar},' for mkey, mvar in kept[:-1]])
+            last_key, last_var = kept[-1]
+            parts.append(f'  "{last_key}", {last_var}')
             parts.append(");")
             parts.append("")
 
-    return '\n'.join(parts)
+    return '\n'.join(parts), len(kept_globals), len(kept)
 
 
 def main():
@@ -456,7 +505,8 @@ def main():
     else:
         parsed = pnr_parsed
 
-    all_classes = set(parsed["class_blocks"].keys())
+    index_parsed(parsed)
+    all_classes = parsed["all_classes"]
     print(f"\nИтого: {len(all_classes)} классов (PNR: {len(pnr_classes)}, Demo: {len(demo_classes)})")
 
     # Валидация: ни один class не должен содержать private global
@@ -491,25 +541,26 @@ def main():
     report.append("")
 
     total = 0
+    cache_data = load_pickle_cache(STRUCT_CACHE_FILE)
+    if cache_data.get("v") == STRUCT_CACHE_VERSION:
+        struct_cache = cache_data.get("files", {})
+    else:
+        struct_cache = {}
+    fresh_cache: dict[str, tuple] = {}
 
     for cabinet in cabinets:
-        structs_map = get_cabinet_structs(cabinet)
+        structs_map = get_cabinet_structs(cabinet, struct_cache, fresh_cache)
         if not structs_map:
             report.append(f"[{cabinet}] Нет struct — пропуск")
             continue
 
         structs = set(structs_map.keys())
         needed = resolve_needed_classes(structs, parsed)
-        excluded = all_classes - needed
 
         # Собираем CSV-файлы для каждого нужного класса
         csv_by_class: dict[str, set[str]] = {}
-        var_to_type = {}
-        for gtype, gvar, _ in parsed["global_list"]:
-            var_to_type[gvar] = gtype
-        key_to_var = {}
-        for mkey, mvar in parsed["mapping_entries"]:
-            key_to_var[mkey] = mvar
+        var_to_type = parsed["var_to_type"]
+        key_to_var = parsed["key_to_var"]
 
         for struct, csv_files in structs_map.items():
             matched_class = None
@@ -526,21 +577,13 @@ def main():
             if matched_class:
                 csv_by_class.setdefault(matched_class, set()).update(csv_files)
 
-        ctl_content = build_ctl(needed, parsed)
+        ctl_content, kept_globals, kept_mapping = build_ctl(needed, parsed)
 
         output = SCRIPTS_DIR / f"Ventcontent_{cabinet}.ctl"
         ctl_bytes = ctl_content.replace('\r\n', '\n').encode("utf-8")
         output.write_bytes(ctl_bytes)
         total += 1
 
-        kept_globals = sum(1 for gt, _, _ in parsed["global_list"] if gt not in excluded)
-        needed_vars = set()
-        for gt, gv, _ in parsed["global_list"]:
-            if gt not in excluded:
-                needed_vars.add(gv)
-        kept_mapping = sum(1 for mk, mv in parsed["mapping_entries"]
-                          if mk not in excluded and mv in needed_vars)
-
         report.append(f"[{cabinet}]")
         report.append(f"  struct: {len(structs)}")
         report.append(f"  классов: {len(needed)} / {len(all_classes)}")
@@ -566,6 +609,9 @@ def main():
         print(f"  [{cabinet}] классов: {len(needed)}, "
               f"global: {kept_globals}, mapping: {kept_mapping}")
 
+    # Только CSV этого запуска — записи удалённых/переименованных не копятся
+    save_pickle_cache(STRUCT_CACHE_FILE, {"v": STRUCT_CACHE_VERSION, "files": fresh_cache})
+
     report.append("=" * 60)
     report.append(f"Сгенерировано: {total}")
 
@@ -576,4 +622,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
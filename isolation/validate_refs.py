@@ -13,29 +13,107 @@
 Результат: missing_files_report.txt
 """
 
+import os
 import re
 import sys
+from collections import defaultdict
 from pathlib import Path
 
 from report_utils import write_report
-from parse_utils import read_text_safe, strip_comments, find_mnemo_dirs, find_cabinet_dirs, PANELS_DIR, OBJECTS_DIR, VISION_DIR, LCSMEMO_DIR, REPORT_DIR
-
-# Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
-sys.stdout.reconfigure(encoding='utf-8', errors='replace')
-sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+from parse_utils import read_bytes_safe, decode_text_safe, code_segments, parallel_map, iter_xml, panels_rel, find_mnemo_dirs, find_cabinet_dirs, load_pickle_cache, save_pickle_cache, PANELS_DIR, OBJECTS_DIR, VISION_DIR, LCSMEMO_DIR, REPORT_DIR
 
 REPORT_FILE = REPORT_DIR / "missing_files_report.txt"
+# Кэш результатов scan_refs между запусками:
+# {"v": REFS_CACHE_VERSION, "files": {путь: (mtime_ns, size, (file_rel, refs))}}
+REFS_CACHE_FILE = REPORT_DIR / ".refs_cache.pkl"
+# Поднимать при любом изменении PATTERN / PATTERN_PATHFS / code_segments / panels_rel:
+# кэш другой версии считается пустым
+REFS_CACHE_VERSION = 1
 
 PATTERN = re.compile(r'objects/[^\s"\'<>]+?\.xml')
 # pathFS без .xml: /objects/objects_<ШКАФ>/PV/FPs/heatControl_... (/ опционален)
-PATTERN_PATHFS = re.compile(r'/?(objects/[^\s"\'<>\\]+?)(?=</prop>|")')
+# Ведущий / вне группы на результат не влияет — без него поиск идёт по литералу "objects/"
+PATTERN_PATHFS = re.compile(r'(objects/[^\s"\'<>\\]+?)(?=</prop>|")')
+
+def scan_refs(xml_file: str) -> tuple[str, list[str]] | None:
+    """
+    Ссылки одного XML (комментарии игнорируются): (file_rel, [ref_path, ...]).
+    None — файл не прочитан.
+    """
+    data = read_bytes_safe(xml_file)
+    if data is None:
+        return None
+
+    file_rel = panels_rel(xml_file)
+
+    # Обе регулярки начинаются с литерала "objects/" — без него ссылок нет, не декодируем
+    if b'objects/' not in data:
+        return file_rel, []
+    text = decode_text_safe(data)
+    if text is None:
+        return None
+
+    # Ищем только в коде вне комментариев — по участкам, без очищенной копии текста
+    # (оба паттерна не пересекают перевод строки, см. code_segments)
+    code, spans = code_segments(text)
+
+    refs = []
+    for start, end in spans:
+        refs.extend(match.group(0) for match in PATTERN.finditer(code, start, end))
+
+    # pathFS — может быть с .xml или без; нормализуем
+    for start, end in spans:
+        for match in PATTERN_PATHFS.finditer(code, start, end):
+            raw = match.group(1)
+            refs.append(raw if raw.endswith(".xml") else raw + ".xml")
+
+    return file_rel, refs
+
+
+def scan_refs_cached(xml_files: list[str]):
+    """
+    scan_refs по списку файлов с дисковым кэшем REFS_CACHE_FILE.
+    Неизменённые файлы (тот же mtime_ns и размер) берутся из кэша, остальные
+    сканируются параллельно. Кэш перезаписывается только текущими файлами;
+    кэш без метки REFS_CACHE_VERSION (старый формат, другая версия) не используется.
+    """
+    data = load_pickle_cache(REFS_CACHE_FILE)
+    cache = data.get("files", {}) if data.get("v") == REFS_CACHE_VERSION else {}
+    fresh: dict[str, tuple] = {}
+    to_scan: list[str] = []
+    stamps: list[tuple[int, int] | None] = []
+
+    for xml_file in xml_files:
+        try:
+            st = os.stat(xml_file)
+        except OSError:
+            to_scan.append(xml_file)
+            stamps.append(None)
+            continue
+        cached = cache.get(xml_file)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            fresh[xml_file] = cached
+            yield cached[2]
+        else:
+            to_scan.append(xml_file)
+            stamps.append((st.st_mtime_ns, st.st_size))
+
+    for xml_file, stamp, scanned in zip(to_scan, stamps, parallel_map(scan_refs, to_scan)):
+        if scanned is None:
+            continue
+        if stamp is not None:
+            fresh[xml_file] = (*stamp, scanned)
+        yield scanned
+
+    save_pickle_cache(REFS_CACHE_FILE, {"v": REFS_CACHE_VERSION, "files": fresh})
+
 
 def build_reverse_map() -> dict[str, set[str]]:
     """
     Строит обратную карту: referenced_path -> set(файлы, которые на него ссылаются).
     Ссылки внутри комментариев игнорируются.
     """
-    reverse: dict[str, set[str]] = {}
+    reverse: defaultdict[str, set[str]] = defaultdict(set)
 
     scan_dirs: list[Path] = []
 
@@ -45,42 +123,62 @@ def build_reverse_map() -> dict[str, set[str]]:
     # Объекты (с учётом cabinets.txt)
     scan_dirs.extend(find_cabinet_dirs(OBJECTS_DIR))
 
-    for scan_dir in scan_dirs:
-        for xml_file in scan_dir.rglob("*.xml"):
-            text = read_text_safe(xml_file)
-            if text is None:
-                continue
+    xml_files = [f for scan_dir in scan_dirs for f in iter_xml(scan_dir)]
 
-            file_rel = str(xml_file.relative_to(PANELS_DIR)).replace("\\", "/")
+    # Файлы сканируются параллельно (или берутся из кэша), карта собирается в основном процессе
+    for file_rel, refs in scan_refs_cached(xml_files):
+        # Интернирование: один объект str на путь — и как ключ карты,
+        # и как элемент множеств (пути из воркеров приходят копиями)
+        file_rel = sys.intern(file_rel)
+        for ref_path in refs:
+            reverse[sys.intern(ref_path)].add(file_rel)
 
-            # Убираем комментарии перед поиском ссылок
-            clean_text = strip_comments(text)
+    return reverse
 
-            for match in PATTERN.finditer(clean_text):
-                ref_path = match.group(0)
-                if ref_path not in reverse:
-                    reverse[ref_path] = set()
-                reverse[ref_path].add(file_rel)
 
-            # pathFS — может быть с .xml или без; нормализуем
-            for match in PATTERN_PATHFS.finditer(clean_text):
-                raw = match.group(1)
-                ref_path = raw if raw.endswith(".xml") else raw + ".xml"
-                if ref_path not in reverse:
-                    reverse[ref_path] = set()
-                reverse[ref_path].add(file_rel)
+def iter_report_lines(missing: dict[str, set[str]],
+                      reverse_map: dict[str, set[str]]):
+    """Строки отчёта по недостающим файлам — генератором, без списка в памяти."""
+    yield "Отчёт: файлы, на которые есть ссылки, но которые не существуют"
+    yield "(ссылки внутри комментариев // и /* */ игнорируются)"
+    yield "=" * 70
+    yield ""
 
-    return reverse
+    if not missing:
+        yield "Все ссылки ведут на существующие файлы. Всё в порядке!"
+        return
+
+    yield f"Всего недостающих файлов: {len(missing)}"
+    yield ""
+
+    for missing_file in sorted(missing.keys()):
+        direct_sources = sorted(missing[missing_file])
+        yield f"✗ {missing_file}"
+
+        for src in direct_sources:
+            yield f"  ← {src}"
+
+            # Одна глубина назад: кто ссылается на src? (без копии множества)
+            for parent in sorted(p for p in reverse_map.get(src, ()) if p != src):
+                yield f"    ← {parent}"
+
+        yield ""
 
 
 def main():
     print("Построение карты ссылок (комментарии игнорируются)...")
     reverse_map = build_reverse_map()
 
+    # Все существующие XML объектов — одним обходом вместо stat на каждую ссылку.
+    # Промах проверяется по ФС как раньше (папки, "..", вариант без .xml).
+    existing = {panels_rel(f) for f in iter_xml(OBJECTS_DIR)}
+
     # Находим недостающие файлы
     # WinCC OA резолвит пути и с .xml, и без → проверяем оба варианта
     missing: dict[str, set[str]] = {}
     for ref_path, sources in reverse_map.items():
+        if ref_path in existing:
+            continue
         full_path = PANELS_DIR / ref_path
         if full_path.exists():
             continue
@@ -92,55 +190,26 @@ def main():
         if not alt_path.exists():
             missing[ref_path] = sources
 
-    # Отчёт
-    report_lines: list[str] = []
-    report_lines.append("Отчёт: файлы, на которые есть ссылки, но которые не существуют")
-    report_lines.append("(ссылки внутри комментариев // и /* */ игнорируются)")
-    report_lines.append("=" * 70)
-    report_lines.append("")
-
+    # Консольный вывод
     if missing:
-        report_lines.append(f"Всего недостающих файлов: {len(missing)}")
-        report_lines.append("")
-
-        for missing_file in sorted(missing.keys()):
-            direct_sources = sorted(missing[missing_file])
-            report_lines.append(f"✗ {missing_file}")
-
-            for src in direct_sources:
-                report_lines.append(f"  ← {src}")
-
-                # Одна глубина назад: кто ссылается на src?
-                parents = reverse_map.get(src, set()).copy()
-                parents.discard(src)
-
-                seen_parents: set[str] = set()
-                for parent in sorted(parents):
-                    if parent not in seen_parents:
-                        seen_parents.add(parent)
-                        report_lines.append(f"    ← {parent}")
-
-            report_lines.append("")
-
-        # Консольный вывод
         print(f"\nНайдено недостающих файлов: {len(missing)}")
         for missing_file in sorted(missing.keys()):
             direct_sources = sorted(missing[missing_file])
             print(f"\n  ✗ {missing_file}")
             for src in direct_sources:
                 print(f"    ← {src}")
-                parents = reverse_map.get(src, set()).copy()
-                parents.discard(src)
-                for parent in sorted(parents):
+                for parent in sorted(p for p in reverse_map.get(src, ()) if p != src):
                     print(f"      ← {parent}")
     else:
-        report_lines.append("Все ссылки ведут на существующие файлы. Всё в порядке!")
         print("\nВсё чисто — все файлы на месте!")
 
-    write_report(REPORT_FILE, report_lines)
+    write_report(REPORT_FILE, iter_report_lines(missing, reverse_map))
 
     print(f"\nОтчёт: {REPORT_FILE}")
 
 
 if __name__ == "__main__":
+    # Windows cp866/cp1251 ломает Unicode → форсируем UTF-8
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
     main()
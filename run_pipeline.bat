@@ -6,6 +6,8 @@ REM  run_pipeline.bat                    - полный прогон
 REM  run_pipeline.bat --append           - append-режим отчётов
 REM  run_pipeline.bat --from 5           - начать с шага 5
 REM  run_pipeline.bat --only 8           - только шаг 8
+REM  run_pipeline.bat --subprocess      - каждый шаг в отдельном процессе
+REM  run_pipeline.bat --parallel        - независимые шаги параллельно (по DEPS)
 
 cd /d "%~dp0"
 python isolation\run_pipeline.py %*